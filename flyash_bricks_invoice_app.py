@@ -7,97 +7,46 @@ How to run:
     pip install -r requirements.txt
     streamlit run flyash_bricks_invoice_app.py
 
-The app stores data in an Excel workbook named
-    Flyash_Bricks_Daily_Invoice_Register.xlsx
+The app stores data in a Parquet file named
+    Flyash_Bricks_Daily_Invoice_Register.parquet
 in the same folder. If the file doesn't exist, it will be created on first save.
+New invoices are appended to Flyash_Bricks_Daily_Invoice_Register.pending.jsonl
+and folded into the Parquet file when reports are rebuilt from the sidebar.
+Monthly totals are kept up to date incrementally in
+Flyash_Bricks_Daily_Invoice_Register.summary.parquet.
+An existing Flyash_Bricks_Daily_Invoice_Register.xlsx is imported on first load.
+The Excel workbook for the sidebar download is rebuilt in a background thread
+after each change, so saving an invoice doesn't wait for it.
+
+Storage, tax and report helpers live in invoice_helpers.py.
 """
 
 from __future__ import annotations
 
 import datetime as _dt
-from pathlib import Path
 
-import pandas as pd
 import streamlit as st
 
-# -------------------------------------------------------------------------
-# Configuration
-# -------------------------------------------------------------------------
-FILE_PATH = Path("Flyash_Bricks_Daily_Invoice_Register.xlsx")
-
-INVOICE_COLUMNS = [
-    "Date",
-    "Invoice No.",
-    "Buyer Name",
-    "Buyer GSTIN",
-    "Place of Supply",
-    "Invoice Value",
-    "Taxable Value",
-    "CGST %", "CGST Amt",
-    "SGST %", "SGST Amt",
-    "IGST %", "IGST Amt",
-    "Total GST", "Total Invoice Value",
-    "Payment Mode", "Vehicle No.", "Remarks",
-]
-
-# -------------------------------------------------------------------------
-# Utility functions
-# -------------------------------------------------------------------------
-def _load_invoices() -> pd.DataFrame:
-    """Load the Daily Invoices sheet if it exists; otherwise return empty DataFrame."""
-    if FILE_PATH.exists():
-        try:
-            return pd.read_excel(FILE_PATH, sheet_name="Daily Invoices", dtype=str)
-        except Exception:
-            pass
-    return pd.DataFrame(columns=INVOICE_COLUMNS)
-
-def _calculate_tax_values(
-    taxable_value: float,
-    cgst_percent: float,
-    sgst_percent: float,
-    igst_percent: float,
-) -> tuple[float, float, float, float, float]:
-    """Return CGST amount, SGST amount, IGST amount, total GST, total invoice value"""
-    cgst_amt = round(taxable_value * cgst_percent / 100, 2)
-    sgst_amt = round(taxable_value * sgst_percent / 100, 2)
-    igst_amt = round(taxable_value * igst_percent / 100, 2)
-    total_gst = round(cgst_amt + sgst_amt + igst_amt, 2)
-    total_invoice_value = round(taxable_value + total_gst, 2)
-    return cgst_amt, sgst_amt, igst_amt, total_gst, total_invoice_value
-
-def _save_workbook(df: pd.DataFrame) -> None:
-    """Write Daily Invoices, Monthly Summary, and GST Report sheets to the workbook."""
-    df_temp = df.copy()
-    df_temp["Date"] = pd.to_datetime(df_temp["Date"], dayfirst=True)
-    df_temp["Month"] = df_temp["Date"].dt.to_period("M").astype(str)
-
-    summary = (
-        df_temp.groupby("Month", as_index=False)
-        .agg({
-            "Invoice No.": "count",
-            "Taxable Value": "sum",
-            "CGST Amt": "sum",
-            "SGST Amt": "sum",
-            "IGST Amt": "sum",
-            "Total GST": "sum",
-            "Total Invoice Value": "sum",
-        })
-        .rename(columns={"Invoice No.": "Total Invoices"})
-    )
-
-    gst_report = df[
-        [
-            "Invoice No.", "Date", "Buyer GSTIN", "Place of Supply",
-            "Taxable Value", "CGST Amt", "SGST Amt", "IGST Amt",
-            "Total GST", "Total Invoice Value",
-        ]
-    ]
-
-    with pd.ExcelWriter(FILE_PATH, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Daily Invoices")
-        summary.to_excel(writer, index=False, sheet_name="Monthly Summary")
-        gst_report.to_excel(writer, index=False, sheet_name="GST Report")
+from invoice_helpers import (
+    DATE_FORMAT,
+    EXCEL_PATH,
+    EXPORT_PATH,
+    GSTIN_RE,
+    append_invoice,
+    calculate_tax_values,
+    data_version,
+    export_bytes,
+    export_is_stale,
+    gst_view,
+    invalid_gstin_count,
+    invoice_count,
+    invoice_view,
+    rebuild_register,
+    refresh_summary,
+    schedule_export,
+    summary_view,
+    warm_groupby_engine,
+)
 
 # -------------------------------------------------------------------------
 # Streamlit UI
@@ -106,10 +55,18 @@ st.set_page_config(page_title="Fly-ash Bricks Invoice Register", layout="wide")
 
 st.title("🧱 Fly-ash Bricks - Daily Invoice Register & GST Tool")
 
-invoice_df = _load_invoices()
+warm_groupby_engine()
+
+# On a session's first run, bring a missing or outdated export up to date.
+if "export_future" not in st.session_state:
+    version = data_version()
+    if invoice_count(version) and export_is_stale(version):
+        st.session_state.export_future = schedule_export()
+    else:
+        st.session_state.export_future = None
 
 # Data Entry
-with st.expander("➕ Add a New Invoice", expanded=not FILE_PATH.exists()):
+with st.expander("➕ Add a New Invoice", expanded=not invoice_count(data_version())):
     with st.form("add_invoice_form"):
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -130,72 +87,76 @@ with st.expander("➕ Add a New Invoice", expanded=not FILE_PATH.exists()):
 
         submitted = st.form_submit_button("Add Invoice")
         if submitted:
+            buyer_gstin = buyer_gstin.strip().upper()
             if not invoice_no or taxable_value <= 0:
                 st.error("Invoice No. and Taxable Value are required.")
+            elif buyer_gstin and not GSTIN_RE.match(buyer_gstin):
+                st.error("Buyer GSTIN must be a 15-character GSTIN, e.g. 29ABCDE1234F2Z5.")
             else:
-                c_amt, s_amt, i_amt, tot_gst, tot_invoice = _calculate_tax_values(
+                c_amt, s_amt, i_amt, tot_gst, tot_invoice = calculate_tax_values(
                     taxable_value, cgst_percent, sgst_percent, igst_percent)
-                new_row = pd.DataFrame({
-                    "Date": [date.strftime("%d-%m-%Y")],
-                    "Invoice No.": [invoice_no],
-                    "Buyer Name": [buyer_name],
-                    "Buyer GSTIN": [buyer_gstin],
-                    "Place of Supply": [place_supply],
-                    "Invoice Value": [tot_invoice],
-                    "Taxable Value": [taxable_value],
-                    "CGST %": [cgst_percent], "CGST Amt": [c_amt],
-                    "SGST %": [sgst_percent], "SGST Amt": [s_amt],
-                    "IGST %": [igst_percent], "IGST Amt": [i_amt],
-                    "Total GST": [tot_gst], "Total Invoice Value": [tot_invoice],
-                    "Payment Mode": [payment_mode],
-                    "Vehicle No.": [vehicle_no],
-                    "Remarks": [remarks],
-                })
-                invoice_df = pd.concat([invoice_df, new_row], ignore_index=True)
-                _save_workbook(invoice_df)
+                row = {
+                    "Date": date.strftime(DATE_FORMAT),
+                    "Invoice No.": invoice_no,
+                    "Buyer Name": buyer_name,
+                    "Buyer GSTIN": buyer_gstin,
+                    "Place of Supply": place_supply,
+                    "Invoice Value": tot_invoice,
+                    "Taxable Value": taxable_value,
+                    "CGST %": cgst_percent, "CGST Amt": c_amt,
+                    "SGST %": sgst_percent, "SGST Amt": s_amt,
+                    "IGST %": igst_percent, "IGST Amt": i_amt,
+                    "Total GST": tot_gst, "Total Invoice Value": tot_invoice,
+                    "Payment Mode": payment_mode,
+                    "Vehicle No.": vehicle_no,
+                    "Remarks": remarks,
+                }
+                append_invoice(row)
+                st.session_state.export_future = schedule_export()
                 st.success(f"Invoice {invoice_no} added and saved.")
 
+refresh_summary()
+version = data_version()
+has_invoices = invoice_count(version) > 0
+
 # Tabs
 tab1, tab2, tab3 = st.tabs(["📄 Daily Invoices", "📊 Monthly Summary", "🗂️ GST Report"])
 with tab1:
     st.subheader("Daily Invoices")
-    st.dataframe(invoice_df, use_container_width=True, hide_index=True)
+    st.dataframe(invoice_view(version), use_container_width=True, hide_index=True)
 with tab2:
     st.subheader("Monthly Summary")
-    if not invoice_df.empty:
-        tmp = invoice_df.copy()
-        tmp["Date"] = pd.to_datetime(tmp["Date"], dayfirst=True)
-        tmp = tmp.assign(Month=tmp["Date"].dt.to_period("M").astype(str))
-        summary_view = tmp.groupby("Month", as_index=False).agg(
-            Total_Invoices=("Invoice No.", "count"),
-            Total_Taxable_Value=("Taxable Value", "sum"),
-            Total_CGST=("CGST Amt", "sum"),
-            Total_SGST=("SGST Amt", "sum"),
-            Total_IGST=("IGST Amt", "sum"),
-            Total_GST=("Total GST", "sum"),
-            Total_Invoice_Value=("Total Invoice Value", "sum"),
-        )
-        st.dataframe(summary_view, use_container_width=True, hide_index=True)
+    if has_invoices:
+        st.dataframe(summary_view(version), use_container_width=True, hide_index=True)
     else:
         st.info("No invoices yet.")
 with tab3:
     st.subheader("GST Report")
-    gst_cols = [
-        "Invoice No.", "Date", "Buyer GSTIN", "Place of Supply",
-        "Taxable Value", "CGST Amt", "SGST Amt", "IGST Amt",
-        "Total GST", "Total Invoice Value",
-    ]
-    st.dataframe(invoice_df[gst_cols], use_container_width=True, hide_index=True)
+    bad_gstins = invalid_gstin_count(version)
+    if bad_gstins:
+        st.warning(f"{bad_gstins} invoice(s) have an invalid Buyer GSTIN.")
+    st.dataframe(gst_view(version), use_container_width=True, hide_index=True)
 
 # Sidebar download
 with st.sidebar:
     st.header("⬇️ Export / Backup")
-    if FILE_PATH.exists():
-        with open(FILE_PATH, "rb") as f:
+    if has_invoices:
+        if st.button("Rebuild Reports"):
+            rebuild_register()
+            st.session_state.export_future = schedule_export()
+            st.rerun()
+        export_future = st.session_state.export_future
+        if export_future is not None and not export_future.done():
+            st.info("Preparing Excel workbook…")
+        elif export_future is not None and export_future.exception() is not None:
+            st.error(f"Excel export failed: {export_future.exception()}")
+        elif EXPORT_PATH.exists():
+            if export_future is not None:
+                st.success("Export ready.")
             st.download_button(
                 label="Download Excel Workbook",
-                data=f,
-                file_name=FILE_PATH.name,
+                data=export_bytes(EXPORT_PATH.stat().st_mtime),
+                file_name=EXCEL_PATH.name,
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
     else:
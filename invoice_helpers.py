@@ -0,0 +1,466 @@
+
+# invoice_helpers.py
+"""Storage, tax and report helpers for the Fly-ash Bricks invoice register app.
+
+Kept out of ``flyash_bricks_invoice_app.py`` because Streamlit re-executes the
+app script on every interaction, while an imported module is only executed once
+per process. Its cached functions and constants are therefore set up a single time.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import streamlit as st
+
+# Streamlit runs the script, and the export worker runs, outside the main thread.
+# Numba's TBB layer, when started from such a thread, hangs the interpreter on
+# exit; prefer OpenMP, which is also safe to call from several threads at once.
+os.environ.setdefault("NUMBA_THREADING_LAYER_PRIORITY", "omp tbb workqueue")
+
+try:
+    import numbagg
+except ImportError:  # monthly_summary falls back to a pandas groupby
+    numbagg = None
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+FILE_PATH = Path("Flyash_Bricks_Daily_Invoice_Register.parquet")
+DATE_FORMAT = "%d-%m-%Y"
+
+# 2-digit state code, 10-character PAN, entity number, "Z", checksum character.
+GSTIN_RE = re.compile(r"^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][A-Z0-9]Z[A-Z0-9]$")
+
+LOG_PATH = FILE_PATH.with_suffix(".pending.jsonl")
+# Pending log lines that could not be parsed are moved here on save rather than dropped.
+REJECTED_PATH = FILE_PATH.with_suffix(".rejected.jsonl")
+SUMMARY_PATH = FILE_PATH.with_suffix(".summary.parquet")
+EXCEL_PATH = FILE_PATH.with_suffix(".xlsx")
+# Separate from EXCEL_PATH, which is only ever read as a legacy register to import.
+EXPORT_PATH = FILE_PATH.with_suffix(".export.xlsx")
+
+# Held while the data file, pending log or monthly summary is written, so that two
+# sessions saving at once can't interleave their read-modify-write updates.
+# Reentrant, so rebuild_register can call save_workbook while holding it.
+_REGISTER_LOCK = threading.RLock()
+
+# A single worker, so exports from several sessions are written one at a time.
+_EXPORT_POOL = ThreadPoolExecutor(max_workers=1)
+# The export still waiting for the worker, as (future, [snapshot]); see schedule_export.
+_queued_export: tuple[Future, list[pd.DataFrame]] | None = None
+_EXPORT_LOCK = threading.Lock()
+
+INVOICE_COLUMNS = [
+    "Date",
+    "Invoice No.",
+    "Buyer Name",
+    "Buyer GSTIN",
+    "Place of Supply",
+    "Invoice Value",
+    "Taxable Value",
+    "CGST %", "CGST Amt",
+    "SGST %", "SGST Amt",
+    "IGST %", "IGST Amt",
+    "Total GST", "Total Invoice Value",
+    "Payment Mode", "Vehicle No.", "Remarks",
+]
+
+NUMERIC_COLUMNS = [
+    "Invoice Value",
+    "Taxable Value",
+    "CGST %", "CGST Amt",
+    "SGST %", "SGST Amt",
+    "IGST %", "IGST Amt",
+    "Total GST", "Total Invoice Value",
+]
+
+AMOUNT_COLUMNS = ["CGST Amt", "SGST Amt", "IGST Amt", "Total GST", "Total Invoice Value"]
+SUMMARY_SUM_COLUMNS = ["Taxable Value", *AMOUNT_COLUMNS]
+
+GST_COLUMNS = (
+    "Invoice No.", "Date", "Buyer GSTIN", "Place of Supply",
+    "Taxable Value", "CGST Amt", "SGST Amt", "IGST Amt",
+    "Total GST", "Total Invoice Value",
+)
+
+# Columns with few distinct values, stored as pandas categoricals once loaded.
+CATEGORY_COLUMNS = ["Payment Mode", "Place of Supply", "Buyer Name", "Buyer GSTIN"]
+
+# -------------------------------------------------------------------------
+# Utility functions
+# -------------------------------------------------------------------------
+def data_version() -> tuple[float, ...]:
+    """Modification times of the data file, pending log and monthly summary (0.0 if missing)."""
+    return tuple(
+        p.stat().st_mtime if p.exists() else 0.0 for p in (FILE_PATH, LOG_PATH, SUMMARY_PATH)
+    )
+
+def _summary_is_stale(version: tuple[float, ...]) -> bool:
+    """True if the monthly summary is missing or older than the invoices it totals."""
+    data_mtime, log_mtime, summary_mtime = version
+    return not SUMMARY_PATH.exists() or summary_mtime < max(data_mtime, log_mtime)
+
+def _parse_dates(dates: pd.Series) -> pd.Series:
+    """Parse ``DATE_FORMAT`` strings on pandas' fixed-format path; bad dates become NaT."""
+    return pd.to_datetime(dates, format=DATE_FORMAT, errors="coerce", cache=True)
+
+def _month_key(dates: pd.Series) -> np.ndarray:
+    """Integer ``year * 100 + month`` grouping key for parsed dates (NaN for NaT)."""
+    return dates.dt.year.to_numpy() * 100 + dates.dt.month.to_numpy()
+
+def _split_pending_log() -> tuple[list[dict], list[str]]:
+    """Invoices in the pending log, and the lines that are not a JSON object.
+
+    A line is left malformed when a write is interrupted, e.g. by a crash.
+    """
+    rows, rejected = [], []
+    with open(LOG_PATH, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            if isinstance(row, dict):
+                rows.append(row)
+            else:
+                rejected.append(line if line.endswith("\n") else line + "\n")
+    return rows, rejected
+
+def _read_pending_log() -> pd.DataFrame:
+    """Read invoices appended since the data file was last rebuilt, skipping malformed lines."""
+    rows, _rejected = _split_pending_log()
+    return pd.DataFrame(rows, columns=INVOICE_COLUMNS)
+
+def _read_legacy_workbook() -> pd.DataFrame:
+    """Read the Daily Invoices sheet of a workbook saved by older versions of the app.
+
+    Uses the Rust-based calamine reader when python-calamine is installed.
+    """
+    try:
+        return pd.read_excel(EXCEL_PATH, sheet_name="Daily Invoices", engine="calamine", dtype=str)
+    except ImportError:
+        return pd.read_excel(EXCEL_PATH, sheet_name="Daily Invoices", engine="openpyxl", dtype=str)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_invoices(version: tuple[float, ...]) -> pd.DataFrame:
+    """Load saved invoices if they exist; otherwise return empty DataFrame.
+
+    Read errors are raised rather than treated as an empty register, so a
+    damaged data file is never overwritten by the next save.
+
+    ``version`` is only the cache key: the files are read once per
+    modification time and later reruns are served from memory.
+
+    Repetitive text columns become categoricals and numeric columns float64.
+    """
+    frames = []
+    if FILE_PATH.exists():
+        frames.append(pd.read_parquet(FILE_PATH))
+    elif EXCEL_PATH.exists():
+        frames.append(_read_legacy_workbook())
+    if LOG_PATH.exists():
+        frames.append(_read_pending_log())
+    if not frames:
+        return pd.DataFrame(columns=INVOICE_COLUMNS)
+    df = pd.concat(frames, ignore_index=True).reindex(columns=INVOICE_COLUMNS)
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+def calculate_tax_values(
+    taxable_value: float,
+    cgst_percent: float,
+    sgst_percent: float,
+    igst_percent: float,
+) -> tuple[float, float, float, float, float]:
+    """Return CGST amount, SGST amount, IGST amount, total GST, total invoice value"""
+    cgst_amt = round(taxable_value * cgst_percent / 100, 2)
+    sgst_amt = round(taxable_value * sgst_percent / 100, 2)
+    igst_amt = round(taxable_value * igst_percent / 100, 2)
+    total_gst = round(cgst_amt + sgst_amt + igst_amt, 2)
+    total_invoice_value = round(taxable_value + total_gst, 2)
+    return cgst_amt, sgst_amt, igst_amt, total_gst, total_invoice_value
+
+def append_invoice(row: dict) -> None:
+    """Append a single invoice to the pending log without rewriting saved data.
+
+    The monthly summary side table is updated in place by adding the
+    invoice to its month, unless it was already stale and needs a full rebuild.
+    """
+    with _REGISTER_LOCK:
+        stale = _summary_is_stale(data_version())
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        load_invoices.clear()
+        if stale:
+            rebuild_summary(load_invoices(data_version()))
+        else:
+            _add_to_summary(row)
+
+def _add_to_summary(row: dict) -> None:
+    """Add one invoice's count and amounts to its month in the summary side table."""
+    summary = pd.read_parquet(SUMMARY_PATH)
+    month = pd.to_datetime(row["Date"], format=DATE_FORMAT).strftime("%Y-%m")
+    mask = summary["Month"] == month
+    if mask.any():
+        amounts = [row[col] for col in SUMMARY_SUM_COLUMNS]
+        summary.loc[mask, SUMMARY_SUM_COLUMNS] = (
+            summary.loc[mask, SUMMARY_SUM_COLUMNS] + amounts).round(2)
+        summary.loc[mask, "Total Invoices"] += 1
+    else:
+        new_month = {"Month": month, "Total Invoices": 1,
+                     **{col: row[col] for col in SUMMARY_SUM_COLUMNS}}
+        summary = pd.concat([summary, pd.DataFrame([new_month])], ignore_index=True)
+        summary = summary.sort_values("Month", ignore_index=True)
+    _write_parquet(summary, SUMMARY_PATH)
+
+def _write_parquet(df: pd.DataFrame, path: Path, **kwargs) -> None:
+    """Write ``df`` to a temporary file and move it into ``path`` atomically."""
+    tmp_path = path.with_suffix(".tmp.parquet")
+    df.to_parquet(tmp_path, engine="pyarrow", index=False, **kwargs)
+    os.replace(tmp_path, path)
+
+def calculate_tax_values_vec(
+    taxable_value: np.ndarray,
+    cgst_percent: np.ndarray,
+    sgst_percent: np.ndarray,
+    igst_percent: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Array version of ``calculate_tax_values`` for recomputing a whole register at once."""
+    cgst_amt = np.round(taxable_value * cgst_percent / 100, 2)
+    sgst_amt = np.round(taxable_value * sgst_percent / 100, 2)
+    igst_amt = np.round(taxable_value * igst_percent / 100, 2)
+    total_gst = np.round(cgst_amt + sgst_amt + igst_amt, 2)
+    total_invoice_value = np.round(taxable_value + total_gst, 2)
+    return cgst_amt, sgst_amt, igst_amt, total_gst, total_invoice_value
+
+def save_workbook(df: pd.DataFrame) -> None:
+    """Persist the full invoice register to the Parquet data file and empty the pending log.
+
+    Numeric columns are coerced, and tax amounts that are missing are filled
+    in from the taxable value and rates; stored amounts are kept as they are.
+    The data file is written to a temporary file and moved into place, and
+    malformed pending log lines are kept in ``REJECTED_PATH``.
+    """
+    with _REGISTER_LOCK:
+        if df.empty and FILE_PATH.exists():
+            raise ValueError(f"Refusing to replace {FILE_PATH} with an empty register.")
+        df = df.copy()
+        for col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64").round(2)
+        amounts = calculate_tax_values_vec(
+            df["Taxable Value"].to_numpy(dtype=float),
+            df["CGST %"].to_numpy(dtype=float),
+            df["SGST %"].to_numpy(dtype=float),
+            df["IGST %"].to_numpy(dtype=float),
+        )
+        for col, values in zip(AMOUNT_COLUMNS, amounts):
+            df[col] = df[col].where(df[col].notna(), values)
+        _write_parquet(df, FILE_PATH, compression="zstd")
+        if LOG_PATH.exists():
+            _rows, rejected = _split_pending_log()
+            if rejected:
+                with open(REJECTED_PATH, "a", encoding="utf-8") as f:
+                    f.writelines(rejected)
+            LOG_PATH.unlink()
+        load_invoices.clear()
+        rebuild_summary(df)
+
+def rebuild_register() -> None:
+    """Fold the pending log into the data file, saving the register as it is on disk.
+
+    The register is read under the same lock as the save, so an invoice
+    appended by another session can't slip in between and be dropped with the log.
+    """
+    with _REGISTER_LOCK:
+        save_workbook(load_invoices(data_version()))
+
+def monthly_summary(df_temp: pd.DataFrame) -> pd.DataFrame:
+    """Invoice count and summed amounts per ``MonthKey`` of an invoice frame.
+
+    Month keys are factorized to dense codes and all amount columns are summed
+    in one ``numbagg.group_nansum`` call; the ``YYYY-MM`` label is only
+    formatted for the resulting (one per month) rows. The amount columns
+    must already be float, as in the working frame built by ``_summarize``.
+    """
+    sums = df_temp[SUMMARY_SUM_COLUMNS].round(2)
+    codes, month_keys = pd.factorize(df_temp["MonthKey"], sort=True)
+    valid = codes >= 0
+    if numbagg is not None and len(month_keys):
+        totals = numbagg.group_nansum(
+            sums.to_numpy().T, codes, axis=-1, num_labels=len(month_keys)).T
+    else:
+        totals = sums[valid].groupby(codes[valid]).sum().to_numpy()
+    counts = np.bincount(
+        codes[valid & df_temp["Invoice No."].notna().to_numpy()], minlength=len(month_keys))
+
+    summary = pd.DataFrame(totals, columns=SUMMARY_SUM_COLUMNS).round(2)
+    summary.insert(0, "Total Invoices", counts)
+    month = pd.to_datetime(pd.Index(month_keys).astype("int64").astype(str), format="%Y%m")
+    summary.insert(0, "Month", month.strftime("%Y-%m"))
+    return summary
+
+def _summarize(df: pd.DataFrame) -> pd.DataFrame:
+    """Monthly summary of an invoice frame with ``DATE_FORMAT`` date strings.
+
+    Only the columns being aggregated are copied into the working frame, and
+    this is the one place their values are coerced to float.
+    """
+    work = pd.DataFrame({
+        "MonthKey": _month_key(_parse_dates(df["Date"])),
+        "Invoice No.": df["Invoice No."],
+        **{col: pd.to_numeric(df[col], errors="coerce").astype("float64")
+           for col in SUMMARY_SUM_COLUMNS},
+    }, index=df.index)
+    return monthly_summary(work)
+
+def rebuild_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """Recompute the monthly summary side table from the full register and save it."""
+    summary = _summarize(df)
+    _write_parquet(summary, SUMMARY_PATH)
+    return summary
+
+def refresh_summary() -> None:
+    """Rebuild the monthly summary side table if it is missing or stale."""
+    with _REGISTER_LOCK:
+        version = data_version()
+        if _summary_is_stale(version):
+            rebuild_summary(load_invoices(version))
+
+@st.cache_resource(show_spinner=False)
+def warm_groupby_engine() -> None:
+    """JIT-compile the numbagg kernel once per process rather than on the first save."""
+    if numbagg is not None:
+        monthly_summary(pd.DataFrame({
+            "MonthKey": [200001],
+            "Invoice No.": ["0"],
+            **{col: [0.0] for col in SUMMARY_SUM_COLUMNS},
+        }))
+
+def _write_sheet(wb: openpyxl.Workbook, title: str, df: pd.DataFrame) -> None:
+    """Stream ``df`` into a new sheet of a write-only workbook, header row first."""
+    ws = wb.create_sheet(title)
+    ws.append(list(df.columns))
+    values = df.astype(object).where(df.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append(row)
+
+def build_workbook(df: pd.DataFrame) -> bytes:
+    """Return an Excel workbook with Daily Invoices, Monthly Summary, and GST Report sheets."""
+    summary = _summarize(df)
+    gst_report = df.loc[:, list(GST_COLUMNS)]
+
+    wb = openpyxl.Workbook(write_only=True)
+    _write_sheet(wb, "Daily Invoices", df)
+    _write_sheet(wb, "Monthly Summary", summary)
+    _write_sheet(wb, "GST Report", gst_report)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def _write_export(df: pd.DataFrame) -> None:
+    """Build the workbook and move it into ``EXPORT_PATH`` atomically."""
+    tmp_path = EXPORT_PATH.with_suffix(".tmp.xlsx")
+    tmp_path.write_bytes(build_workbook(df))
+    os.replace(tmp_path, EXPORT_PATH)
+
+def export_is_stale(version: tuple[float, ...]) -> bool:
+    """True if the export workbook is missing or older than the saved invoices."""
+    data_mtime, log_mtime, _summary_mtime = version
+    return not EXPORT_PATH.exists() or EXPORT_PATH.stat().st_mtime < max(data_mtime, log_mtime)
+
+def _run_queued_export(snapshot: list[pd.DataFrame]) -> None:
+    """Worker side of ``schedule_export``: write the newest snapshot queued so far."""
+    global _queued_export
+    with _EXPORT_LOCK:
+        _queued_export = None
+        df = snapshot[0]
+    _write_export(df)
+
+def schedule_export() -> Future:
+    """Rebuild the export workbook on the background worker.
+
+    The snapshot is the register on disk, so invoices added by other
+    sessions are never left out of the export. If an export is still
+    waiting for the worker, its snapshot is replaced by this newer one and
+    its future is returned, so only the latest register is written.
+    """
+    global _queued_export
+    df = load_invoices(data_version())
+    with _EXPORT_LOCK:
+        if _queued_export is not None:
+            future, snapshot = _queued_export
+            snapshot[0] = df
+            return future
+        snapshot = [df]
+        future = _EXPORT_POOL.submit(_run_queued_export, snapshot)
+        _queued_export = (future, snapshot)
+        return future
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def export_bytes(mtime: float) -> bytes:
+    """Contents of the export workbook, read from disk once per modification time."""
+    return EXPORT_PATH.read_bytes()
+
+def _arrow_backed(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert text and numeric columns to pyarrow dtypes so ``st.dataframe`` needn't re-encode them.
+
+    Categoricals are left alone; they already map to Arrow dictionary arrays.
+    """
+    return df.convert_dtypes(dtype_backend="pyarrow", convert_integer=False)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def invoice_view(version: tuple[float, ...]) -> pd.DataFrame:
+    """Daily Invoices tab contents, computed once per data version."""
+    return _arrow_backed(load_invoices(version))
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def summary_view(version: tuple[float, ...]) -> pd.DataFrame:
+    """Monthly Summary tab contents, read from the side table once per data version.
+
+    A stale side table is summarized from the full register without being
+    saved; ``refresh_summary`` rewrites it outside the cache.
+    """
+    if _summary_is_stale(version):
+        summary = _summarize(load_invoices(version))
+    else:
+        summary = pd.read_parquet(SUMMARY_PATH)
+    return _arrow_backed(summary).rename(columns={
+        "Total Invoices": "Total_Invoices",
+        "Taxable Value": "Total_Taxable_Value",
+        "CGST Amt": "Total_CGST",
+        "SGST Amt": "Total_SGST",
+        "IGST Amt": "Total_IGST",
+        "Total GST": "Total_GST",
+        "Total Invoice Value": "Total_Invoice_Value",
+    })
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def invoice_count(version: tuple[float, ...]) -> int:
+    """Number of saved invoices, counted once per data version."""
+    return len(load_invoices(version))
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def invalid_gstin_count(version: tuple[float, ...]) -> int:
+    """Number of saved invoices whose Buyer GSTIN is filled in but malformed."""
+    gstins = load_invoices(version)["Buyer GSTIN"].astype("string").fillna("")
+    return int(((gstins != "") & ~gstins.str.match(GSTIN_RE)).sum())
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def gst_view(version: tuple[float, ...]) -> pd.DataFrame:
+    """GST Report tab contents, computed once per data version."""
+    return _arrow_backed(load_invoices(version).loc[:, list(GST_COLUMNS)])
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pytest
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def register_dir(tmp_path, monkeypatch):
+    """Run in an empty directory so the app's relative data paths land in ``tmp_path``."""
+    monkeypatch.chdir(tmp_path)
+    st.cache_data.clear()
+    yield tmp_path
+    st.cache_data.clear()
+
+
+@pytest.fixture
+def add_invoice(register_dir):
+    """Append an invoice through ``invoice_helpers.append_invoice``, as the app's form does."""
+    import invoice_helpers
+
+    def add(invoice_no, date, taxable_value, cgst=9.0, sgst=9.0, igst=0.0):
+        c_amt, s_amt, i_amt, tot_gst, tot_invoice = invoice_helpers.calculate_tax_values(
+            taxable_value, cgst, sgst, igst)
+        invoice_helpers.append_invoice({
+            "Date": date, "Invoice No.": invoice_no, "Buyer Name": "Buyer",
+            "Buyer GSTIN": "29ABCDE1234F2Z5", "Place of Supply": "Karnataka",
+            "Invoice Value": tot_invoice, "Taxable Value": taxable_value,
+            "CGST %": cgst, "CGST Amt": c_amt, "SGST %": sgst, "SGST Amt": s_amt,
+            "IGST %": igst, "IGST Amt": i_amt,
+            "Total GST": tot_gst, "Total Invoice Value": tot_invoice,
+            "Payment Mode": "Cash", "Vehicle No.": "", "Remarks": "",
+        })
+
+    return add
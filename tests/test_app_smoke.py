@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import invoice_helpers
+
+APP_PATH = str(Path(__file__).resolve().parents[1] / "flyash_bricks_invoice_app.py")
+FILE_NAME = "Flyash_Bricks_Daily_Invoice_Register.parquet"
+LOG_NAME = "Flyash_Bricks_Daily_Invoice_Register.pending.jsonl"
+EXPORT_NAME = "Flyash_Bricks_Daily_Invoice_Register.export.xlsx"
+
+
+def _app():
+    # The first run compiles the numba groupby kernel, which can exceed AppTest's 3s default.
+    return AppTest.from_file(APP_PATH, default_timeout=60)
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def _add_invoice(at, invoice_no, taxable_value=100.0):
+    _widget(at.text_input, "Invoice No.").input(invoice_no)
+    _widget(at.number_input, "Taxable Value (₹)").set_value(taxable_value)
+    _widget(at.button, "Add Invoice").click()
+    return at.run()
+
+
+def test_app_starts_on_empty_register(register_dir):
+    at = _app().run()
+
+    assert not at.exception
+    assert "No data saved yet." in [w.value for w in at.warning]
+
+
+def test_add_invoice(register_dir):
+    at = _add_invoice(_app().run(), "A1")
+
+    assert not at.exception
+    assert "Invoice A1 added and saved." in [s.value for s in at.success]
+    saved = invoice_helpers.load_invoices(invoice_helpers.data_version())
+    assert saved["Invoice No."].tolist() == ["A1"]
+
+
+def test_rebuild_keeps_stored_amounts(register_dir):
+    rows = [
+        # Blank rate, stored amounts: kept as they are.
+        {"Date": "05-01-2024", "Invoice No.": "A1", "Taxable Value": 100.0,
+         "CGST %": None, "SGST %": 9.0, "IGST %": 0.0,
+         "CGST Amt": 9.0, "SGST Amt": 9.0, "IGST Amt": 0.0,
+         "Total GST": 18.0, "Total Invoice Value": 118.0},
+        # Missing amounts: filled in from the rates.
+        {"Date": "06-01-2024", "Invoice No.": "A2", "Taxable Value": 100.0,
+         "CGST %": 9.0, "SGST %": 9.0, "IGST %": 0.0,
+         "SGST Amt": 9.0, "IGST Amt": 0.0},
+    ]
+    (register_dir / LOG_NAME).write_text(
+        "".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+
+    at = _app().run()
+    _widget(at.button, "Rebuild Reports").click()
+    at.run()
+
+    assert not at.exception
+    saved = pd.read_parquet(register_dir / FILE_NAME).set_index("Invoice No.")
+    assert saved.loc["A1", ["CGST Amt", "Total GST", "Total Invoice Value"]].tolist() == [
+        9.0, 18.0, 118.0]
+    assert saved.loc["A2", ["CGST Amt", "Total GST", "Total Invoice Value"]].tolist() == [
+        9.0, 18.0, 118.0]
+
+
+def test_rebuild_keeps_invoices_from_other_sessions(register_dir):
+    first = _add_invoice(_app().run(), "A1")
+    second = _add_invoice(_app().run(), "B1")
+    assert not second.exception
+
+    _widget(first.button, "Rebuild Reports").click()
+    first.run()
+
+    assert not first.exception
+    assert not (register_dir / LOG_NAME).exists()
+    saved = pd.read_parquet(register_dir / FILE_NAME)
+    assert sorted(saved["Invoice No."]) == ["A1", "B1"]
+
+    first.session_state["export_future"].result(timeout=30)
+    sheet = openpyxl.load_workbook(register_dir / EXPORT_NAME)["Daily Invoices"]
+    invoice_nos = [row[1] for row in sheet.iter_rows(min_row=2, values_only=True)]
+    assert sorted(invoice_nos) == ["A1", "B1"]
+
+
+def test_new_session_exports_existing_register(register_dir):
+    (register_dir / LOG_NAME).write_text(json.dumps(
+        {"Date": "05-01-2024", "Invoice No.": "A1", "Taxable Value": 100.0,
+         "CGST %": 9.0, "SGST %": 9.0, "IGST %": 0.0}) + "\n", encoding="utf-8")
+
+    at = _app().run()
+    at.session_state["export_future"].result(timeout=30)
+    at.run()
+
+    assert not at.exception
+    assert (register_dir / EXPORT_NAME).exists()
+    assert at.get("download_button")
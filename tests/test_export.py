@@ -0,0 +1,24 @@
+import threading
+
+import openpyxl
+
+import invoice_helpers
+
+
+def test_queued_exports_are_coalesced(add_invoice):
+    release = threading.Event()
+    busy = invoice_helpers._EXPORT_POOL.submit(release.wait)
+    try:
+        add_invoice("A1", "05-01-2024", 100.0)
+        first = invoice_helpers.schedule_export()
+        add_invoice("A2", "06-01-2024", 100.0)
+        second = invoice_helpers.schedule_export()
+    finally:
+        release.set()
+    busy.result(timeout=30)
+    second.result(timeout=30)
+
+    assert first is second
+    sheet = openpyxl.load_workbook(invoice_helpers.EXPORT_PATH)["Daily Invoices"]
+    invoice_nos = [row[1] for row in sheet.iter_rows(min_row=2, values_only=True)]
+    assert invoice_nos == ["A1", "A2"]
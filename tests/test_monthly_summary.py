@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import invoice_helpers
+
+
+def _work_frame():
+    return pd.DataFrame({
+        "MonthKey": [202401, 202402, 202401, np.nan],
+        "Invoice No.": ["1", "2", "3", "4"],
+        "Taxable Value": [100.0, 200.0, 50.5, 999.0],
+        "CGST Amt": [9.0, 18.0, 4.55, 1.0],
+        "SGST Amt": [9.0, 18.0, 4.55, 1.0],
+        "IGST Amt": [0.0, 0.0, 0.0, 1.0],
+        "Total GST": [18.0, 36.0, 9.1, 3.0],
+        "Total Invoice Value": [118.0, 236.0, 59.6, 1002.0],
+    })
+
+
+@pytest.fixture(params=["numbagg", "pandas"])
+def aggregator(request, monkeypatch):
+    if request.param == "numbagg":
+        pytest.importorskip("numbagg")
+    else:
+        monkeypatch.setattr(invoice_helpers, "numbagg", None)
+    return request.param
+
+
+def test_monthly_summary_groups_by_month(aggregator):
+    summary = invoice_helpers.monthly_summary(_work_frame())
+
+    assert summary["Month"].tolist() == ["2024-01", "2024-02"]
+    assert summary["Total Invoices"].tolist() == [2, 1]
+    assert summary["Taxable Value"].tolist() == [150.5, 200.0]
+    assert summary["Total Invoice Value"].tolist() == [177.6, 236.0]
+
+
+def test_monthly_summary_empty(aggregator):
+    summary = invoice_helpers.monthly_summary(_work_frame().iloc[:0])
+
+    assert summary.empty
+    assert list(summary.columns) == [
+        "Month", "Total Invoices", *invoice_helpers.SUMMARY_SUM_COLUMNS]
+
+
+def test_warm_groupby_engine(aggregator):
+    invoice_helpers.warm_groupby_engine.clear()
+    invoice_helpers.warm_groupby_engine()
+
+
+def test_summarize_coerces_text_amounts(aggregator):
+    df = pd.DataFrame({
+        "Date": ["05-01-2024", "20-01-2024"],
+        "Invoice No.": ["1", "2"],
+        **{col: ["10.5", "bad"] for col in invoice_helpers.SUMMARY_SUM_COLUMNS},
+    })
+
+    summary = invoice_helpers._summarize(df)
+
+    assert summary["Total Invoices"].tolist() == [2]
+    assert summary["Taxable Value"].tolist() == [10.5]
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import invoice_helpers
+
+
+def test_unreadable_data_file_is_not_an_empty_register(register_dir):
+    invoice_helpers.FILE_PATH.write_bytes(b"not a parquet file")
+
+    with pytest.raises((OSError, ValueError)):
+        invoice_helpers.load_invoices(invoice_helpers.data_version())
+
+
+def test_malformed_log_lines_are_skipped_and_kept_on_save(add_invoice):
+    add_invoice("A1", "05-01-2024", 100.0)
+    with open(invoice_helpers.LOG_PATH, "a", encoding="utf-8") as f:
+        f.write('{"Date": "06-01-2024", "Invoice No.": "A2"')
+    invoice_helpers.load_invoices.clear()
+
+    df = invoice_helpers.load_invoices(invoice_helpers.data_version())
+    assert df["Invoice No."].tolist() == ["A1"]
+
+    invoice_helpers.save_workbook(df)
+    assert not invoice_helpers.LOG_PATH.exists()
+    assert invoice_helpers.REJECTED_PATH.read_text(encoding="utf-8") == (
+        '{"Date": "06-01-2024", "Invoice No.": "A2"\n')
+    assert pd.read_parquet(invoice_helpers.FILE_PATH)["Invoice No."].tolist() == ["A1"]
+
+
+def test_save_refuses_to_replace_data_with_empty_frame(add_invoice):
+    add_invoice("A1", "05-01-2024", 100.0)
+    invoice_helpers.save_workbook(invoice_helpers.load_invoices(invoice_helpers.data_version()))
+
+    with pytest.raises(ValueError):
+        invoice_helpers.save_workbook(pd.DataFrame(columns=invoice_helpers.INVOICE_COLUMNS))
+    assert pd.read_parquet(invoice_helpers.FILE_PATH)["Invoice No."].tolist() == ["A1"]
+
+
+def test_rebuild_keeps_invoices_appended_meanwhile(add_invoice):
+    def work(i):
+        add_invoice(f"A{i}", "05-01-2024", 100.0)
+        if i % 4 == 0:
+            invoice_helpers.rebuild_register()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(work, range(40)))
+
+    df = invoice_helpers.load_invoices(invoice_helpers.data_version())
+    assert sorted(df["Invoice No."]) == sorted(f"A{i}" for i in range(40))
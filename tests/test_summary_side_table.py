@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import invoice_helpers
+
+
+def test_incremental_summary_matches_rebuild(add_invoice):
+    add_invoice("A1", "05-01-2024", 100.0)
+    add_invoice("A2", "20-01-2024", 250.55)
+    add_invoice("A3", "02-02-2024", 80.0, cgst=0.0, sgst=0.0, igst=18.0)
+    add_invoice("A4", "15-12-2023", 10.0)
+    incremental = pd.read_parquet(invoice_helpers.SUMMARY_PATH)
+
+    rebuilt = invoice_helpers.rebuild_summary(
+        invoice_helpers.load_invoices(invoice_helpers.data_version()))
+
+    assert incremental["Month"].tolist() == ["2023-12", "2024-01", "2024-02"]
+    pd.testing.assert_frame_equal(incremental, rebuilt, check_dtype=False)
+
+
+def test_concurrent_appends_are_all_summarized(add_invoice):
+    add_invoice("A0", "01-01-2024", 100.0)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda i: add_invoice(f"A{i}", "05-01-2024", 100.0), range(1, 41)))
+
+    summary = pd.read_parquet(invoice_helpers.SUMMARY_PATH)
+    assert summary["Total Invoices"].tolist() == [41]
+    assert summary["Taxable Value"].tolist() == [4100.0]
+
+
+def test_summary_view_does_not_write_side_table(add_invoice):
+    add_invoice("A1", "05-01-2024", 100.0)
+    invoice_helpers.SUMMARY_PATH.unlink()
+
+    view = invoice_helpers.summary_view(invoice_helpers.data_version())
+
+    assert view["Total_Invoices"].tolist() == [1]
+    assert not invoice_helpers.SUMMARY_PATH.exists()
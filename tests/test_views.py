@@ -0,0 +1,19 @@
+import invoice_helpers
+
+
+def test_view_numeric_columns_stay_float(add_invoice):
+    add_invoice("A1", "05-01-2024", 100.0)
+    version = invoice_helpers.data_version()
+
+    loaded = invoice_helpers.load_invoices(version)
+    assert (loaded[invoice_helpers.NUMERIC_COLUMNS].dtypes == "float64").all()
+
+    invoice_view = invoice_helpers.invoice_view(version)
+    for col in invoice_helpers.NUMERIC_COLUMNS:
+        assert invoice_view[col].dtype == "double[pyarrow]", col
+    gst_view = invoice_helpers.gst_view(version)
+    for col in invoice_helpers.SUMMARY_SUM_COLUMNS:
+        assert gst_view[col].dtype == "double[pyarrow]", col
+    summary_view = invoice_helpers.summary_view(version)
+    assert summary_view["Total_IGST"].dtype == "double[pyarrow]"
+    assert summary_view["Total_Invoice_Value"].dtype == "double[pyarrow]"